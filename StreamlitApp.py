@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import json
+from collections import deque
 from dotenv import load_dotenv
 
 st.set_page_config(
@@ -15,6 +17,17 @@ load_dotenv()
 # API URL Setup
 API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
 
+def iter_status(response, final):
+    """Yield progress lines from the /query/stream SSE feed and store the final event in `final`."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data: "):
+            continue
+        event = json.loads(line[len("data: "):])
+        if event.get("event") == "final":
+            final.update(event)
+        else:
+            yield event.get("message", "") + "  \n"
+
 # Fixed for Dark Mode)
 st.markdown("""
     <style>
@@ -30,8 +43,15 @@ st.title("🌍 AI Travel Planner")
 # to hide port
 # st.caption(f"Backend Connected: `{API_URL}`") 
 
+# One keep-alive session per browser tab so each chat turn reuses the backend connection
+if "http" not in st.session_state:
+    st.session_state.http = requests.Session()
+    st.session_state.http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    st.session_state.http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Keep only the most recent turns so reruns stay cheap in long conversations
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = deque(maxlen=40)
 
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -52,55 +72,71 @@ if prompt := st.chat_input("Plan your trip (e.g., 'Find hotels in Paris under $2
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             try:
-                response = requests.post(
-                    f"{API_URL}/query",
+                with st.session_state.http.post(
+                    f"{API_URL}/query/stream",
                     json={"query": prompt},
+                    stream=True,
                     timeout=60
-                )
-                
-                if response.status_code == 200:
-                    api_response = response.json()
-                    data = api_response.get("data")
-                    res_type = api_response.get("response_type")
+                ) as response:
+                    if response.status_code == 200:
+                        # Show agent progress as it happens, then render the final result
+                        api_response = {}
+                        st.write_stream(iter_status(response, api_response))
+                        data = api_response.get("data")
+                        res_type = api_response.get("response_type")
                     
-                    display_text = ""
-
-                    # --- Response Formatting ---
-                    if res_type == "flight":
-                        st.success("✈️ Flight Recommendation")
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("Airline", data['airline'])
-                            st.metric("Price", f"${data['price']}")
-                        with col2:
-                            st.write(f"**Route:** {data['departure_time']} -> {data['arrival_time']}")
-                        st.info(f"**Reason:** {data['recommendation_reason']}")
-                        display_text = f"Flight: {data['airline']} (${data['price']})"
-
-                    elif res_type == "hotel":
-                        st.success("🏨 Hotel Recommendation")
-                        st.subheader(data['name'])
-                        st.write(f"📍 **Location:** {data['location']}")
-                        st.write(f"💰 **Price:** ${data['price_per_night']}/night")
-                        st.write(f"**Amenities:** {', '.join(data['amenities'])}")
-                        display_text = f"Hotel: {data['name']}"
-
-                    elif res_type == "travel_plan":
-                        st.success(f"🗺️ Plan for {data['destination']}")
-                        st.write(f"**Duration:** {data['duration_days']} days | **Budget:** ${data['budget']}")
-                        with st.expander("See Activities"):
-                            for act in data['activities']:
-                                st.write(f"- {act}")
-                        display_text = f"Plan for {data['destination']}"
+                        display_text = ""
+
+                        # --- Response Formatting ---
+                        if res_type == "flight":
+                            st.success("✈️ Flight Recommendation")
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.metric("Airline", data['airline'])
+                                st.metric("Price", f"${data['price']}")
+                            with col2:
+                                st.write(f"**Route:** {data['departure_time']} -> {data['arrival_time']}")
+                            st.info(f"**Reason:** {data['recommendation_reason']}")
+                            display_text = f"Flight: {data['airline']} (${data['price']})"
+
+                        elif res_type == "hotel":
+                            st.success("🏨 Hotel Recommendation")
+                            st.subheader(data['name'])
+                            st.write(f"📍 **Location:** {data['location']}")
+                            st.write(f"💰 **Price:** ${data['price_per_night']}/night")
+                            st.write(f"**Amenities:** {', '.join(data['amenities'])}")
+                            display_text = f"Hotel: {data['name']}"
+
+                        elif res_type == "travel_plan":
+                            st.success(f"🗺️ Plan for {data['destination']}")
+                            st.write(f"**Duration:** {data['duration_days']} days | **Budget:** ${data['budget']}")
+                            with st.expander("See Activities"):
+                                for act in data['activities']:
+                                    st.write(f"- {act}")
+                            display_text = f"Plan for {data['destination']}"
+
+                        elif res_type == "combo":
+                            flight, hotel = data['flight'], data['hotel']
+                            st.success("✈️ Flight Recommendation")
+                            st.write(f"**{flight['airline']}** ({flight['departure_time']} -> {flight['arrival_time']}) - ${flight['price']}")
+                            st.info(f"**Reason:** {flight['recommendation_reason']}")
+                            st.success("🏨 Hotel Recommendation")
+                            st.write(f"**{hotel['name']}**, {hotel['location']} - ${hotel['price_per_night']}/night")
+                            st.info(f"**Reason:** {hotel['recommendation_reason']}")
+                            display_text = f"Flight: {flight['airline']} (${flight['price']}) | Hotel: {hotel['name']}"
+
+                        elif res_type == "error":
+                            st.error(api_response.get("error") or api_response.get("message"))
+                            display_text = f"Error: {api_response.get('error')}"
+
+                        else:
+                            display_text = api_response.get("message") or str(data)
+                            st.write(display_text)
+
+                        st.session_state.messages.append({"role": "assistant", "content": display_text})
 
                     else:
-                        st.write(str(data))
-                        display_text = str(data)
-
-                    st.session_state.messages.append({"role": "assistant", "content": display_text})
-
-                else:
-                    st.error(f"Error: {response.status_code}")
+                        st.error(f"Error: {response.status_code}")
 
             except Exception as e:
                 st.error(f"Connection Failed: {e}")
\ No newline at end of file
@@ -1,12 +1,20 @@
 import os
+import sys
+import re
 import json
-import requests
-from typing import List, Optional, Union, Dict
+import orjson
+import httpx
+import asyncio
+from functools import lru_cache
+from cachetools import TTLCache
+from typing import Dict, List, Optional, Union
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import Agent, OpenAIChatCompletionsModel, Runner, function_tool, set_tracing_disabled
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from agents import Agent, ModelSettings, OpenAIChatCompletionsModel, Runner, function_tool, set_tracing_disabled
 
 # 1. Load Environment Variables 
 load_dotenv() 
@@ -15,16 +23,26 @@ BASE_URL = os.getenv("BASE_URL")
 API_KEY = os.getenv("API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME")
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+# Optional: set when the endpoint supports OpenAI's prompt_cache_key parameter
+PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY")
 
 if not BASE_URL or not API_KEY or not MODEL_NAME:
     raise ValueError("Please set BASE_URL, API_KEY, and MODEL_NAME in your .env file.")
 
 # 2. Setup Client 
-client = AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY)
+# SDK default client (its connection limits and timeouts) with HTTP/2 so concurrent agent calls multiplex
+_LLM_POOL = DefaultAsyncHttpxClient(http2=True)
+client = AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY, http_client=_LLM_POOL)
 set_tracing_disabled(disabled=True)
 
+# (description, temp) keyed by rounded (lat, lon); one lock per key stops duplicate refetches
+_WX_CACHE = TTLCache(maxsize=512, ttl=600)
+_WX_LOCKS = TTLCache(maxsize=512, ttl=600)
+
 # 3. Pydantic Models 
 class FlightRecommendation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     airline: str
     departure_time: str
     arrival_time: str
@@ -33,6 +51,8 @@ class FlightRecommendation(BaseModel):
     recommendation_reason: str
     
 class HotelRecommendation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str
     location: str
     price_per_night: float
@@ -40,171 +60,356 @@ class HotelRecommendation(BaseModel):
     recommendation_reason: str    
 
 class TravelPlan(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     destination: str
     duration_days: int
     budget: float
     activities: List[str] = Field(description="List of recommended activities")
     notes: str = Field(description="Additional notes or recommendations")
 
+_TYPE_MAP = {FlightRecommendation: "flight", HotelRecommendation: "hotel", TravelPlan: "travel_plan"}
+
 class TravelQueryRequest(BaseModel):
     query: str = Field(..., description="User's travel question")
 
+class ComboRecommendation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    flight: FlightRecommendation
+    hotel: HotelRecommendation
+
+# Plain union: agent output models cannot carry a Literal tag (it would leak into the LLM's
+# output schema), and smart-mode unions already match model instances by exact type
+TravelData = Union[FlightRecommendation, HotelRecommendation, TravelPlan, ComboRecommendation]
+
 class TravelResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     response_type: str  
-    data: Union[FlightRecommendation, HotelRecommendation, TravelPlan, str, Dict]
+    data: Optional[TravelData] = None
     message: Optional[str] = None
+    error: Optional[str] = None
 
 # 4. Tools 
 
 @function_tool
-def get_weather_forecast(lat: float, lon: float) -> str:
+async def get_weather_forecast(lat: float, lon: float) -> str:
     """Get weather forecast."""
     api_key = os.getenv("WEATHER_API_KEY")
     if not api_key:
         return "Weather API key missing. Assume sunny."
     
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            weather = data["weather"][0]["description"]
-            temp = data["main"]["temp"]
+    key = (round(lat, 2), round(lon, 2))
+    if key in _WX_CACHE:
+        weather, temp = _WX_CACHE[key]
+        return f"Weather at ({lat}, {lon}): {weather}, {temp}°C."
+
+    lock = _WX_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Another request may have filled the cache while we waited
+        if key in _WX_CACHE:
+            weather, temp = _WX_CACHE[key]
             return f"Weather at ({lat}, {lon}): {weather}, {temp}°C."
-        return "Weather unavailable."
-    except Exception as e:
-        return f"Weather error: {str(e)}"
+
+        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
+        try:
+            # Shared async client created at app startup, so the event loop is never blocked
+            response = await app.state.http.get(url)
+            if response.status_code == 200:
+                data = response.json()
+                weather = data["weather"][0]["description"]
+                temp = data["main"]["temp"]
+                _WX_CACHE[key] = (weather, temp)
+                return f"Weather at ({lat}, {lon}): {weather}, {temp}°C."
+            return "Weather unavailable."
+        except Exception as e:
+            return f"Weather error: {str(e)}"
+
+# Flight results per destination keyword, serialized once with orjson at import time
+_FLIGHTS_BY_DEST = {
+    "sylhet": orjson.dumps([
+        {"airline": "Biman Bangladesh", "departure_time": "08:00", "arrival_time": "08:45", "price": 45.00, "direct": True},
+        {"airline": "US-Bangla", "departure_time": "14:30", "arrival_time": "15:15", "price": 50.00, "direct": True}
+    ]).decode(),
+    "bangkok": orjson.dumps([
+        {"airline": "Thai Airways", "departure_time": "11:00", "arrival_time": "14:30", "price": 350.00, "direct": True},
+        {"airline": "Biman Bangladesh", "departure_time": "10:00", "arrival_time": "13:30", "price": 280.00, "direct": True}
+    ]).decode(),
+}
+
+# Generic fallback
+_FALLBACK_FLIGHTS = orjson.dumps([
+    {"airline": "Global Air", "departure_time": "09:00", "arrival_time": "12:00", "price": 150.00, "direct": False},
+    {"airline": "Eco Fly", "departure_time": "18:00", "arrival_time": "21:00", "price": 120.00, "direct": True}
+]).decode()
+
+# Hotel results per city keyword; kept as lists so they can still be filtered by price
+_HOTELS_BY_CITY = {
+    "paris": [
+        {"name": "Hotel Eiffel Paris", "location": "Central Paris", "price_per_night": 220.00, "amenities": ["WiFi", "Pool"]},
+        {"name": "Seine River View", "location": "Riverside", "price_per_night": 180.00, "amenities": ["WiFi", "Parking"]}
+    ],
+    "sylhet": [
+        {"name": "Grand Sylhet Hotel", "location": "Airport Road", "price_per_night": 90.00, "amenities": ["Pool", "WiFi", "Buffet"]},
+        {"name": "Rose View Hotel", "location": "Shahjalal Upashahar", "price_per_night": 70.00, "amenities": ["Gym", "Breakfast"]}
+    ],
+    "dhaka": [
+        {"name": "InterContinental Dhaka", "location": "Minto Road", "price_per_night": 150.00, "amenities": ["Luxury Pool", "Spa"]},
+        {"name": "Pan Pacific Sonargaon", "location": "Karwan Bazar", "price_per_night": 130.00, "amenities": ["Gym", "Bar"]}
+    ],
+}
+
+# One precompiled alternation per table, so dispatch is a single scan of the input
+_FLIGHT_DEST_RE = re.compile("|".join(map(re.escape, _FLIGHTS_BY_DEST)))
+_HOTEL_CITY_RE = re.compile("|".join(map(re.escape, _HOTELS_BY_CITY)))
+
+def _first_key(pattern: re.Pattern, table: Dict, text: str) -> Optional[str]:
+    # Keep the table-order priority of the old if/elif chain when several keys match
+    found = {m.group(0) for m in pattern.finditer(text)}
+    return next((k for k in table if k in found), None)
+
+def _fallback_hotels(city_title: str) -> List[Dict]:
+    # Generic fallback for unknown cities
+    return [
+        {"name": f"{city_title} City Center Hotel", "location": "Downtown", "price_per_night": 100.00, "amenities": ["WiFi", "Restaurant"]},
+        {"name": f"The {city_title} Inn", "location": "Near Airport", "price_per_night": 80.00, "amenities": ["Parking", "Breakfast"]}
+    ]
+
+@lru_cache(maxsize=256)
+def _flights_cached(dest_lower: str) -> str:
+    # Logic to return relevant flights based on input
+    key = _first_key(_FLIGHT_DEST_RE, _FLIGHTS_BY_DEST, dest_lower)
+    return _FLIGHTS_BY_DEST[key] if key else _FALLBACK_FLIGHTS
 
 @function_tool
 def search_flights(origin: str, destination: str, date: str) -> str:
     """Search for flights based on destination."""
-    
-    # Logic to return relevant flights based on input
-    dest_lower = destination.lower()
-    
-    if "sylhet" in dest_lower:
-        flights = [
-            {"airline": "Biman Bangladesh", "departure_time": "08:00", "arrival_time": "08:45", "price": 45.00, "direct": True},
-            {"airline": "US-Bangla", "departure_time": "14:30", "arrival_time": "15:15", "price": 50.00, "direct": True}
-        ]
-    elif "bangkok" in dest_lower:
-        flights = [
-            {"airline": "Thai Airways", "departure_time": "11:00", "arrival_time": "14:30", "price": 350.00, "direct": True},
-            {"airline": "Biman Bangladesh", "departure_time": "10:00", "arrival_time": "13:30", "price": 280.00, "direct": True}
-        ]
-    else:
-        # Generic fallback
-        flights = [
-            {"airline": "Global Air", "departure_time": "09:00", "arrival_time": "12:00", "price": 150.00, "direct": False},
-            {"airline": "Eco Fly", "departure_time": "18:00", "arrival_time": "21:00", "price": 120.00, "direct": True}
-        ]
-        
-    return json.dumps(flights)
+    # Only the destination changes the result, so it is the whole cache key
+    return _flights_cached(destination.lower())
 
-@function_tool
-def search_hotels(city: str, check_in: str = None, check_out: str = None, max_price: float = None) -> str:
-    """Search for hotels in a specific city."""
-    
+@lru_cache(maxsize=256)
+def _hotels_cached(city_lower: str, max_price: Optional[float]) -> str:
     # Logic to return relevant hotels based on city
-    city_lower = city.lower()
-    
-    if "paris" in city_lower:
-        hotels = [
-            {"name": "Hotel Eiffel Paris", "location": "Central Paris", "price_per_night": 220.00, "amenities": ["WiFi", "Pool"]},
-            {"name": "Seine River View", "location": "Riverside", "price_per_night": 180.00, "amenities": ["WiFi", "Parking"]}
-        ]
-    elif "sylhet" in city_lower:
-        hotels = [
-            {"name": "Grand Sylhet Hotel", "location": "Airport Road", "price_per_night": 90.00, "amenities": ["Pool", "WiFi", "Buffet"]},
-            {"name": "Rose View Hotel", "location": "Shahjalal Upashahar", "price_per_night": 70.00, "amenities": ["Gym", "Breakfast"]}
-        ]
-    elif "dhaka" in city_lower:
-        hotels = [
-            {"name": "InterContinental Dhaka", "location": "Minto Road", "price_per_night": 150.00, "amenities": ["Luxury Pool", "Spa"]},
-            {"name": "Pan Pacific Sonargaon", "location": "Karwan Bazar", "price_per_night": 130.00, "amenities": ["Gym", "Bar"]}
-        ]
-    else:
-        # Generic fallback for unknown cities
-        hotels = [
-            {"name": f"{city.title()} City Center Hotel", "location": "Downtown", "price_per_night": 100.00, "amenities": ["WiFi", "Restaurant"]},
-            {"name": f"The {city.title()} Inn", "location": "Near Airport", "price_per_night": 80.00, "amenities": ["Parking", "Breakfast"]}
-        ]
+    key = _first_key(_HOTEL_CITY_RE, _HOTELS_BY_CITY, city_lower)
+    hotels = _HOTELS_BY_CITY[key] if key else _fallback_hotels(city_lower.title())
 
     # Filter by price if max_price is provided
     if max_price:
         hotels = [h for h in hotels if h["price_per_night"] <= max_price]
         
-    return json.dumps(hotels)
+    return orjson.dumps(hotels).decode()
+
+@function_tool
+def search_hotels(city: str, check_in: str = None, check_out: str = None, max_price: float = None) -> str:
+    """Search for hotels in a specific city."""
+    return _hotels_cached(city.lower(), max_price or None)
 
 # --- 5. Agents ---
+# Instructions are fixed module constants so every call sends an identical, cacheable prompt prefix
+_FLIGHT_SYS = "Find flights based on the user's destination. Always check the destination carefully."
+
+_HOTEL_SYS = "Find hotels in the specific city requested by the user. Do not guess the city."
+
+_TRAVEL_SYS = """
+    You are a travel planner. 
+    1. If the user asks for a TRIP PLAN (itinerary, activities), generate the plan yourself using your knowledge base. Do not hand off to the hotel or flight agent unless the user specifically asks to BOOK or FIND hotels/flights.
+    2. If the user specifically asks for FLIGHTS, hand off to the Flight Specialist.
+    3. If the user specifically asks for HOTELS, hand off to the Hotel Specialist.
+    4. Provide budget in the requested currency if possible.
+    """
+
+def _cache_settings(agent_key: str) -> ModelSettings:
+    # Routes requests for the same agent to the same prompt cache on supporting endpoints
+    if not PROMPT_CACHE_KEY:
+        return ModelSettings()
+    return ModelSettings(extra_args={"prompt_cache_key": f"{PROMPT_CACHE_KEY}:{agent_key}"})
+
 flight_agent = Agent(
     name="Flight Specialist",
-    instructions="Find flights based on the user's destination. Always check the destination carefully.",
+    instructions=_FLIGHT_SYS,
     model=OpenAIChatCompletionsModel(model=MODEL_NAME, openai_client=client),
+    model_settings=_cache_settings("flight"),
     tools=[search_flights],
     output_type=FlightRecommendation
 )
 
 hotel_agent = Agent(
     name="Hotel Specialist",
-    instructions="Find hotels in the specific city requested by the user. Do not guess the city.",
+    instructions=_HOTEL_SYS,
     model=OpenAIChatCompletionsModel(model=MODEL_NAME, openai_client=client),
+    model_settings=_cache_settings("hotel"),
     tools=[search_hotels],
     output_type=HotelRecommendation
 )
 
 travel_agent = Agent(
     name="Travel Planner",
-    instructions="""
-    You are a travel planner. 
-    1. If the user asks for a TRIP PLAN (itinerary, activities), generate the plan yourself using your knowledge base. Do not hand off to the hotel or flight agent unless the user specifically asks to BOOK or FIND hotels/flights.
-    2. If the user specifically asks for FLIGHTS, hand off to the Flight Specialist.
-    3. If the user specifically asks for HOTELS, hand off to the Hotel Specialist.
-    4. Provide budget in the requested currency if possible.
-    """,
+    instructions=_TRAVEL_SYS,
     model=OpenAIChatCompletionsModel(model=MODEL_NAME, openai_client=client),
+    model_settings=_cache_settings("travel"),
     tools=[get_weather_forecast],
     handoffs=[flight_agent, hotel_agent],
     output_type=TravelPlan
 )
 
+# Cheap intent detection so obvious queries skip the planner's LLM round trip
+_FLIGHT_INTENT_RE = re.compile(r"\b(flights?|fly)\b", re.I)
+_HOTEL_INTENT_RE = re.compile(r"\b(hotels?|stay|accommodations?)\b", re.I)
+_PLAN_INTENT_RE = re.compile(r"\b(plan|itinerary)\b", re.I)
+
 # --- 6. FastAPI App ---
 app = FastAPI(title="AI Travel Agent API")
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
+@app.on_event("startup")
+async def open_http_client():
+    app.state.http = httpx.AsyncClient(
+        timeout=5,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await app.state.http.aclose()
+    await _LLM_POOL.aclose()
+
+async def _warm_up():
+    # Opens the LLM and OpenWeather connections before the first real query needs them
+    async def ping_llm():
+        await client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1
+        )
+
+    async def ping_weather():
+        await app.state.http.get(
+            f"https://api.openweathermap.org/data/2.5/weather?lat=0&lon=0&appid={WEATHER_API_KEY or 'x'}",
+            timeout=2
+        )
+
+    # Failures are fine here; the real request will simply pay the connection cost itself
+    await asyncio.gather(
+        asyncio.wait_for(ping_llm(), 10),
+        asyncio.wait_for(ping_weather(), 10),
+        return_exceptions=True
+    )
+
+@app.on_event("startup")
+async def warm_up_connections():
+    # In the background, so startup is not held up by slow or unreachable endpoints
+    app.state.warm_up = asyncio.create_task(_warm_up())
+
+def _response_type(final) -> str:
+    # Identify type
+    return _TYPE_MAP.get(type(final), "general")
+
+def _is_combo_query(q: str) -> bool:
+    # Itinerary requests belong to the planner even when they mention flights and hotels
+    if _PLAN_INTENT_RE.search(q):
+        return False
+    return bool(_FLIGHT_INTENT_RE.search(q) and _HOTEL_INTENT_RE.search(q))
+
+def _route_agent(q: str) -> Agent:
+    # Single-intent queries go straight to the specialist; anything else needs the planner
+    if _PLAN_INTENT_RE.search(q):
+        return travel_agent
+    wants_flight = bool(_FLIGHT_INTENT_RE.search(q))
+    wants_hotel = bool(_HOTEL_INTENT_RE.search(q))
+    if wants_flight and not wants_hotel:
+        return flight_agent
+    if wants_hotel and not wants_flight:
+        return hotel_agent
+    return travel_agent
+
+async def _run_combo(q: str) -> TravelResponse:
+    # Independent specialist calls, so overlap them instead of chaining handoffs
+    flights, hotels = await asyncio.gather(
+        Runner.run(flight_agent, q),
+        Runner.run(hotel_agent, q)
+    )
+    return TravelResponse(
+        success=True,
+        response_type="combo",
+        data=ComboRecommendation(flight=flights.final_output, hotel=hotels.final_output),
+        message="Success"
+    )
+
+def _final_response(final) -> TravelResponse:
+    res_type = _response_type(final)
+    if res_type == "general":
+        # Plain text output has no structured arm, so it travels in the message
+        return TravelResponse(success=True, response_type=res_type, message=str(final))
+    return TravelResponse(success=True, response_type=res_type, data=final, message="Success")
+
+def _error_response(e: Exception) -> TravelResponse:
+    return TravelResponse(
+        success=False,
+        response_type="error",
+        error=str(e),
+        message="An error occurred"
+    )
+
+def _sse(payload: Dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
 
 @app.get("/")
 def home():
     return {"message": "Travel Agent API is running"}
 
-@app.post("/query", response_model=TravelResponse)
+@app.post("/query", response_model=TravelResponse, response_model_exclude_none=True, response_class=ORJSONResponse)
 async def query_agent(request: TravelQueryRequest):
     try:
+        q = request.query
+        if _is_combo_query(q):
+            return await _run_combo(q)
+
         # Run the agent
-        result = await Runner.run(travel_agent, request.query)
-        final = result.final_output
-        
-        # Identify type
-        res_type = "general"
-        if hasattr(final, "airline"): res_type = "flight"
-        elif hasattr(final, "name") and hasattr(final, "amenities"): res_type = "hotel"
-        elif hasattr(final, "destination"): res_type = "travel_plan"
-        
-        return TravelResponse(
-            success=True,
-            response_type=res_type,
-            data=final,
-            message="Success"
-        )
+        result = await Runner.run(_route_agent(q), q)
+        return _final_response(result.final_output)
     except Exception as e:
         # Fallback if Pydantic validation fails or other errors
-        return TravelResponse(
-            success=False,
-            response_type="error",
-            data=str(e),
-            message="An error occurred"
-        )
+        return _error_response(e)
+
+@app.post("/query/stream")
+async def query_agent_stream(request: TravelQueryRequest):
+    """Stream progress events while the agent runs, then the final TravelResponse."""
+
+    async def sse_gen():
+        try:
+            if _is_combo_query(request.query):
+                yield _sse({"event": "status", "message": "Searching flights and hotels..."})
+                response = await _run_combo(request.query)
+                yield _sse({"event": "final", **response.model_dump(mode="json")})
+                return
+
+            result = Runner.run_streamed(_route_agent(request.query), request.query)
+            async for ev in result.stream_events():
+                # Structured outputs arrive as partial JSON, so only surface agent/tool progress
+                if ev.type == "agent_updated_stream_event":
+                    yield _sse({"event": "status", "message": f"{ev.new_agent.name} is working on it..."})
+                elif ev.type == "run_item_stream_event" and ev.item.type == "tool_call_item":
+                    tool_name = getattr(ev.item.raw_item, "name", "tool")
+                    yield _sse({"event": "status", "message": f"Calling `{tool_name}`..."})
+
+            response = _final_response(result.final_output)
+        except Exception as e:
+            response = _error_response(e)
+        yield _sse({"event": "final", **response.model_dump(mode="json")})
+
+    return StreamingResponse(sse_gen(), media_type="text/event-stream")
 
 if __name__ == "__main__":
     import uvicorn
     # 0.0.0.0 for Docker compatibility
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Import string is required for multiple workers; uvloop is not available on Windows
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WORKERS", os.cpu_count() or 1)),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
\ No newline at end of file
@@ -1,7 +1,10 @@
 import os
-import json
+import orjson
 import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
@@ -27,6 +30,16 @@ if not BASE_URL or not API_KEY or not MODEL_NAME:
 
 client = AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY)
 set_tracing_disabled(disabled=True)
+
+# Shared HTTP session so repeat weather lookups reuse the pooled keep-alive connection
+_WEATHER_SESSION = requests.Session()
+_WEATHER_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=Retry(total=2, backoff_factor=0.2))
+)
+
+# (description, temp) keyed by rounded (lat, lon) so nearby coordinates share one entry
+_WX_CACHE = TTLCache(maxsize=512, ttl=600)
     
 # --- Models for structured outputs ---
 class FlightRecommendation(BaseModel):
@@ -50,6 +63,8 @@ class TravelPlan(BaseModel):
     budget: float
     activities: List[str] = Field(description="List of recommended activities")
     notes: str = Field(description="Additional notes or recommendations")
+
+_TYPE_MAP = {FlightRecommendation: "flight", HotelRecommendation: "hotel", TravelPlan: "travel_plan"}
     
 # --- Tools ---
 
@@ -62,12 +77,17 @@ def get_weather_forecast(lat: float, lon: float) -> str:
     if not api_key:
         return "Weather API key not configured."
 
+    key = (round(lat, 2), round(lon, 2))
+    if key in _WX_CACHE:
+        weather, temp = _WX_CACHE[key]
+        return f"Current weather at ({lat}, {lon}): {weather}, temperature around {temp}°C."
+
     url = (
         f"https://api.openweathermap.org/data/2.5/weather"
         f"?lat={lat}&lon={lon}&appid={api_key}&units=metric"
     )
 
-    response = requests.get(url)
+    response = _WEATHER_SESSION.get(url, timeout=5)
 
     if response.status_code != 200:
         return f"Failed to fetch weather. Error: {response.json().get('message')}"
@@ -76,32 +96,50 @@ def get_weather_forecast(lat: float, lon: float) -> str:
     weather = data["weather"][0]["description"]
     temp = data["main"]["temp"]
 
+    _WX_CACHE[key] = (weather, temp)
     return f"Current weather at ({lat}, {lon}): {weather}, temperature around {temp}°C."
 
+# Sample flight results, serialized once at import time
+_FLIGHTS_JSON = orjson.dumps([
+    {
+        "airline": "Qatar Airways",
+        "departure_time": "09:10",
+        "arrival_time": "13:40",
+        "price": 420.50,
+        "direct": True
+    },
+    {
+        "airline": "Emirates",
+        "departure_time": "22:00",
+        "arrival_time": "06:30",
+        "price": 380.00,
+        "direct": False
+    }
+]).decode()
+
 @function_tool
 def search_flights(origin: str, destination: str, date: str) -> str:
     """Search for flights between two cities on a specific date."""
 
     # This example shows real-style integration
+    return _FLIGHTS_JSON
 
-    flights = [
-        {
-            "airline": "Qatar Airways",
-            "departure_time": "09:10",
-            "arrival_time": "13:40",
-            "price": 420.50,
-            "direct": True
-        },
-        {
-            "airline": "Emirates",
-            "departure_time": "22:00",
-            "arrival_time": "06:30",
-            "price": 380.00,
-            "direct": False
-        }
-    ]
-
-    return json.dumps(flights)
+# Simplified response format
+_HOTELS = [
+    {
+        "name": "Hotel Eiffel Paris",
+        "location": "Central Paris",
+        "price_per_night": 220.00,
+        "amenities": ["WiFi", "Pool", "Breakfast"]
+    },
+    {
+        "name": "Seine River View",
+        "location": "Riverside",
+        "price_per_night": 180.00,
+        "amenities": ["WiFi", "Parking"]
+    }
+]
+_HOTELS_JSON = orjson.dumps(_HOTELS).decode()
 
 @function_tool
 def search_hotels(city: str, check_in: str, check_out: str, max_price: float = None) -> str:
@@ -111,26 +149,12 @@ def search_hotels(city: str, check_in: str, check_out: str, max_price: float = N
         "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
     }
 
-    # Simplified response format
-    hotels = [
-        {
-            "name": "Hotel Eiffel Paris",
-            "location": "Central Paris",
-            "price_per_night": 220.00,
-            "amenities": ["WiFi", "Pool", "Breakfast"]
-        },
-        {
-            "name": "Seine River View",
-            "location": "Riverside",
-            "price_per_night": 180.00,
-            "amenities": ["WiFi", "Parking"]
-        }
-    ]
+    if not max_price:
+        return _HOTELS_JSON
 
-    if max_price:
-        hotels = [h for h in hotels if h["price_per_night"] <= max_price]
+    hotels = [h for h in _HOTELS if h["price_per_night"] <= max_price]
 
-    return json.dumps(hotels)
+    return orjson.dumps(hotels).decode()
 
 # Main Travel Agent 
 
@@ -215,7 +239,8 @@ async def main():
         print("\nFINAL RESPONSE:")
         
         # Format the output based on the type of response
-        if hasattr(result.final_output, "airline"):  # Flight recommendation
+        res_type = _TYPE_MAP.get(type(result.final_output), "general")
+        if res_type == "flight":  # Flight recommendation
             flight = result.final_output
             print("\n✈️ FLIGHT RECOMMENDATION ✈️")
             print(f"Airline: {flight.airline}")
@@ -225,7 +250,7 @@ async def main():
             print(f"Direct Flight: {'Yes' if flight.direct_flight else 'No'}")
             print(f"\nWhy this flight: {flight.recommendation_reason}")
             
-        elif hasattr(result.final_output, "name") and hasattr(result.final_output, "amenities"):  # Hotel recommendation
+        elif res_type == "hotel":  # Hotel recommendation
             hotel = result.final_output
             print("\n🏨 HOTEL RECOMMENDATION 🏨")
             print(f"Name: {hotel.name}")
@@ -238,7 +263,7 @@ async def main():
                 
             print(f"\nWhy this hotel: {hotel.recommendation_reason}")
             
-        elif hasattr(result.final_output, "destination"):  # Travel plan
+        elif res_type == "travel_plan":  # Travel plan
             travel_plan = result.final_output
             print(f"\n🌍 TRAVEL PLAN FOR {travel_plan.destination.upper()} 🌍")
             print(f"Duration: {travel_plan.duration_days} days")